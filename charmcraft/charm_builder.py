@@ -25,6 +25,7 @@ import hashlib
 import os
 import pathlib
 import shutil
+import stat
 import subprocess
 import sys
 
@@ -123,25 +124,31 @@ class CharmBuilder:
         """
         print("Linking in generic paths")
 
-        for basedir, dirnames, filenames in os.walk(str(self.builddir), followlinks=False):
-            abs_basedir = pathlib.Path(basedir)
-            rel_basedir = abs_basedir.relative_to(self.builddir)
+        # work with plain strings, building Path objects for every entry is too costly
+        builddir = str(self.builddir)
+        installdir = str(self.installdir)
+        builddir_len = len(builddir) + 1
+
+        for basedir, dirnames, filenames in os.walk(builddir, followlinks=False):
+            rel_basedir = basedir[builddir_len:]
 
             # process the directories
             ignored = []
             for pos, name in enumerate(dirnames):
-                rel_path = rel_basedir / name
-                abs_path = abs_basedir / name
+                rel_path = os.path.join(rel_basedir, name)
+                abs_path = os.path.join(basedir, name)
 
-                if self.ignore_rules.match(str(rel_path), is_dir=True):
-                    print(f"Ignoring directory because of rules: {str(rel_path)!r}")
+                if self.ignore_rules.match(rel_path, is_dir=True):
+                    print(f"Ignoring directory because of rules: {rel_path!r}")
                     ignored.append(pos)
-                elif abs_path.is_symlink():
+                    continue
+
+                mode = os.lstat(abs_path).st_mode
+                if stat.S_ISLNK(mode):
                     dest_path = self.installdir / rel_path
-                    self.create_symlink(abs_path, dest_path)
+                    self.create_symlink(pathlib.Path(abs_path), dest_path)
                 else:
-                    dest_path = self.installdir / rel_path
-                    dest_path.mkdir(mode=abs_path.stat().st_mode)
+                    os.mkdir(os.path.join(installdir, rel_path), mode=mode)
 
             # in the future don't go inside ignored directories
             for pos in reversed(ignored):
@@ -149,27 +156,30 @@ class CharmBuilder:
 
             # process the files
             for name in filenames:
-                rel_path = rel_basedir / name
-                abs_path = abs_basedir / name
+                rel_path = os.path.join(rel_basedir, name)
+                abs_path = os.path.join(basedir, name)
 
-                if self.ignore_rules.match(str(rel_path), is_dir=False):
-                    print(f"Ignoring file because of rules: {str(rel_path)!r}")
-                elif abs_path.is_symlink():
-                    dest_path = self.installdir / rel_path
-                    self.create_symlink(abs_path, dest_path)
-                elif abs_path.is_file():
+                if self.ignore_rules.match(rel_path, is_dir=False):
+                    print(f"Ignoring file because of rules: {rel_path!r}")
+                    continue
+
+                mode = os.lstat(abs_path).st_mode
+                if stat.S_ISLNK(mode):
                     dest_path = self.installdir / rel_path
+                    self.create_symlink(pathlib.Path(abs_path), dest_path)
+                elif stat.S_ISREG(mode):
+                    dest_path = os.path.join(installdir, rel_path)
                     try:
-                        os.link(str(abs_path), str(dest_path))
+                        os.link(abs_path, dest_path)
                     except PermissionError:
                         # when not allowed to create hard links
-                        shutil.copy2(str(abs_path), str(dest_path))
+                        shutil.copy2(abs_path, dest_path)
                     except OSError as e:
                         if e.errno != errno.EXDEV:
                             raise
-                        shutil.copy2(str(abs_path), str(dest_path))
+                        shutil.copy2(abs_path, dest_path)
                 else:
-                    print(f"Ignoring file because of type: {str(rel_path)!r}")
+                    print(f"Ignoring file because of type: {rel_path!r}")
 
         # the linked entrypoint is calculated here because it's when it's really in the build dir
         return self.installdir / self.entrypoint.relative_to(self.builddir)
@@ -16,6 +16,7 @@
 
 """Infrastructure for the 'pack' command."""
 import argparse
+import os
 import pathlib
 
 import yaml
@@ -23,7 +24,14 @@ from craft_cli import ArgumentParsingError, CraftError, emit
 
 from charmcraft import const, env, instrum, package
 from charmcraft.cmdbase import BaseCommand
-from charmcraft.utils import find_charm_sources, get_charm_name_from_path, load_yaml
+from charmcraft.utils import (
+    DEFAULT_ZIP_COMPRESSION,
+    HAVE_LIBYAML,
+    ZIP_COMPRESSIONS,
+    find_charm_sources,
+    get_charm_name_from_path,
+    load_yaml,
+)
 
 # the minimum set of files in a bundle
 MANDATORY_FILES = [const.BUNDLE_FILENAME, "README.md"]
@@ -99,6 +107,22 @@ class PackCommand(BaseCommand):
             type=pathlib.Path,
             help="Dump measurements to the specified file",
         )
+        parser.add_argument(
+            "--compression",
+            choices=ZIP_COMPRESSIONS,
+            default=DEFAULT_ZIP_COMPRESSION,
+            help="Compression method for the files in the package, defaults to "
+            f"{DEFAULT_ZIP_COMPRESSION!r}; 'zstd' needs Python 3.14 (otherwise deflate is "
+            "used) and the package may not be deployable, as Juju and Charmhub may not "
+            "support it",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="Number of bases to pack at the same time in their own instances, "
+            "defaults to 1",
+        )
         include_charm_group = parser.add_mutually_exclusive_group()
         include_charm_group.add_argument(
             "--include-all-charms",
@@ -126,6 +150,8 @@ class PackCommand(BaseCommand):
     def run(self, parsed_args: argparse.Namespace) -> None:
         """Run the command."""
         self._check_config(config_file=True)
+        config_type = self.config.type
+        project_dir = self.config.project.dirpath
 
         builder = package.Builder(
             config=self.config,
@@ -134,44 +160,48 @@ class PackCommand(BaseCommand):
             shell=parsed_args.shell,
             shell_after=parsed_args.shell_after,
             measure=parsed_args.measure,
+            compression=parsed_args.compression,
+            jobs=parsed_args.jobs,
         )
 
         # decide if this will work on a charm or a bundle
-        if self.config.type == "charm":
+        if config_type == "charm":
             if parsed_args.include_all_charms:
                 raise ArgumentParsingError(
                     "--include-all-charms can only be used when packing a bundle. "
-                    f"Currently trying to pack: {self.config.project.dirpath}"
+                    f"Currently trying to pack: {project_dir}"
                 )
             if parsed_args.include_charm:
                 raise ArgumentParsingError(
                     "--include-charm can only be used when packing a bundle. "
-                    f"Currently trying to pack: {self.config.project.dirpath}"
+                    f"Currently trying to pack: {project_dir}"
                 )
             if parsed_args.output_bundle:
                 raise ArgumentParsingError(
                     "--output-bundle can only be used when packing a bundle. "
-                    f"Currently trying to pack: {self.config.project.dirpath}"
+                    f"Currently trying to pack: {project_dir}"
                 )
             self._check_config(bases=True)
             with instrum.Timer("Whole pack run"):
                 self._pack_charm(parsed_args, builder)
-        elif self.config.type == "bundle":
+        elif config_type == "bundle":
             if parsed_args.shell:
                 package.launch_shell()
                 return
-            bundle_filepath = self.config.project.dirpath / const.BUNDLE_FILENAME
+            bundle_filepath = project_dir / const.BUNDLE_FILENAME
+            if not HAVE_LIBYAML:
+                emit.debug("LibYAML is not available, parsing the bundle will be slower.")
             bundle = load_yaml(bundle_filepath)
             if bundle is None:
                 raise CraftError(f"Missing or invalid main bundle file: {str(bundle_filepath)!r}.")
             if parsed_args.include_all_charms:
                 charm_names = bundle.get("applications", {}).keys()
-                charms = find_charm_sources(self.config.project.dirpath, charm_names)
+                charms = find_charm_sources(project_dir, charm_names)
             elif parsed_args.include_charm:
                 charms: dict[str, pathlib.Path] = {}
                 for path in parsed_args.include_charm:
                     if not path.is_absolute():
-                        path = self.config.project.dirpath / path
+                        path = project_dir / path
                     name = get_charm_name_from_path(path)
                     charms[name] = path
             else:
@@ -182,7 +212,7 @@ class PackCommand(BaseCommand):
                 with parsed_args.output_bundle.open("wt") as file:
                     yaml.safe_dump(bundle, file)
         else:
-            raise CraftError(f"Unknown type {self.config.type!r} in charmcraft.yaml")
+            raise CraftError(f"Unknown type {config_type!r} in charmcraft.yaml")
 
         if parsed_args.measure:
             instrum.dump(parsed_args.measure)
@@ -203,6 +233,8 @@ class PackCommand(BaseCommand):
     def _pack_charm(self, parsed_args, builder: package.Builder) -> None:
         """Pack a charm."""
         self._validate_bases_indices(parsed_args.bases_index)
+        if parsed_args.jobs < 1:
+            raise ArgumentParsingError(f"--jobs must be at least 1, got {parsed_args.jobs}.")
 
         # build
         emit.progress("Packing the charm.")
@@ -233,7 +265,7 @@ class PackCommand(BaseCommand):
     ) -> None:
         """Pack a bundle."""
         emit.progress("Packing the bundle.")
-        project = self.config.project
+        project_dir = self.config.project.dirpath
 
         if self.config.parts:
             config_parts = self.config.parts.copy()
@@ -245,17 +277,20 @@ class PackCommand(BaseCommand):
         # predefined values set automatically.
         bundle_part = config_parts.get("bundle")
         if bundle_part and bundle_part.get("plugin") == "bundle":
-            # set prime filters
+            # set prime filters, listing the project directory once to check them (but
+            # checking the missing ones, as names may not match in case-insensitive systems)
+            with os.scandir(project_dir) as entries:
+                present = {entry.name for entry in entries}
             for fname in MANDATORY_FILES:
-                fpath = project.dirpath / fname
-                if not fpath.exists():
+                fpath = project_dir / fname
+                if fname not in present and not fpath.exists():
                     raise CraftError(f"Missing mandatory file: {str(fpath)!r}.")
             prime = bundle_part.setdefault("prime", [])
             prime.extend(MANDATORY_FILES)
 
             # set source if empty or not declared in charm part
             if not bundle_part.get("source"):
-                bundle_part["source"] = str(project.dirpath)
+                bundle_part["source"] = str(project_dir)
 
         # run the parts lifecycle
         emit.debug(f"Parts definition: {config_parts}")
@@ -17,6 +17,7 @@
 """Provide utilities to measure performance in different parts of the app."""
 
 import json
+import threading
 import uuid
 from time import time
 from typing import Any
@@ -33,13 +34,35 @@ class _Measurements:
     def __init__(self):
         # ancestors list when a measure starts (last item is direct parent); the
         # first value is special, None, to reflect the "root", the rest are
-        # measurement ids
-        self.parents = [None]  # start with a unique "root"
+        # measurement ids; it's kept per thread so measurements done concurrently
+        # (e.g. packing several bases at once) do not overlap each other
+        self._local = threading.local()
 
         # simple dict to hold measurements information; the key is the measurement
         # id and each value holds all it info
         self.measurements = {}
 
+    @property
+    def parents(self):
+        """Return the ancestors list of the current thread."""
+        try:
+            return self._local.parents
+        except AttributeError:
+            self._local.parents = parents = [None]  # start with a unique "root"
+            return parents
+
+    def get_current(self) -> str | None:
+        """Return the id of the ongoing measurement in the current thread (None if none)."""
+        return self.parents[-1]
+
+    def set_current(self, measurement_id: str | None) -> None:
+        """Set the parent of the measurements to start in the current thread.
+
+        This is for worker threads, so their measurements are children of the one
+        ongoing in the thread that gave them the work.
+        """
+        self._local.parents = [measurement_id]
+
     def start(self, msg: str, extra_info: dict[str, Any]):
         """Start a measurement."""
         this_id = uuid.uuid4().hex
@@ -96,6 +119,8 @@ class _Measurements:
 _measurements = _Measurements()
 dump = _measurements.dump
 merge_from = _measurements.merge_from
+get_current = _measurements.get_current
+set_current = _measurements.set_current
 
 
 class Timer:
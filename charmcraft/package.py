@@ -20,8 +20,9 @@ import pathlib
 import shutil
 import subprocess
 import tempfile
-import zipfile
+import threading
 from collections.abc import Collection, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import craft_parts
 import yaml
@@ -40,6 +41,7 @@ from charmcraft.metafiles.metadata import create_metadata_yaml
 from charmcraft.models.charmcraft import Base, BasesConfiguration
 from charmcraft.models.lint import LintResult
 from charmcraft.utils import (
+    DEFAULT_ZIP_COMPRESSION,
     build_zip,
     collect_charmlib_pydeps,
     get_host_architecture,
@@ -98,12 +100,16 @@ class Builder:
         shell,
         shell_after,
         measure,
+        compression=DEFAULT_ZIP_COMPRESSION,
+        jobs=1,
     ):
         self.force_packing = force
         self.debug = debug
         self.shell = shell
         self.shell_after = shell_after
         self.measure = measure
+        self.compression = compression
+        self.jobs = jobs
 
         self.charmdir = config.project.dirpath
         self.buildpath = self.charmdir / const.BUILD_DIRNAME
@@ -286,6 +292,35 @@ class Builder:
                 "No suitable 'build-on' environment found in any 'bases' configuration."
             )
 
+        if (
+            not managed_mode
+            and not destructive_mode
+            and self.jobs > 1
+            and len(build_plan) > 1
+            and not (self.debug or self.shell or self.shell_after)
+        ):
+            # each plan is packed in its own instance, so they are independent and
+            # can run at the same time; the results keep the plan's order
+            emit.debug(f"Building {len(build_plan)} bases with {self.jobs} jobs.")
+            measurement_id = charmcraft.instrum.get_current()
+            stop = threading.Event()
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = [
+                    executor.submit(self._pack_plan_in_instance, plan, measurement_id, stop)
+                    for plan in build_plan
+                ]
+                try:
+                    # raise the first failure as soon as it happens
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    # do not start packing the bases still waiting (the ones being
+                    # packed are waited for)
+                    stop.set()
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+                return [future.result() for future in futures]
+
         charms = []
         for plan in build_plan:
             emit.debug(f"Building for 'bases[{plan.bases_index:d}][{plan.build_on_index:d}]'.")
@@ -316,10 +351,38 @@ class Builder:
 
         return charms
 
+    def _pack_plan_in_instance(
+        self, plan, measurement_id: str | None, stop: threading.Event
+    ) -> str | None:
+        """Pack the charm for a build plan in its instance, alongside other plans.
+
+        The measurements done meanwhile are hooked under the indicated one. Nothing is
+        done if the stop event is set, which happens if this packing fails.
+        """
+        if stop.is_set():
+            return None
+        charmcraft.instrum.set_current(measurement_id)
+        emit.debug(f"Building for 'bases[{plan.bases_index:d}][{plan.build_on_index:d}]'.")
+        try:
+            return self.pack_charm_in_instance(
+                bases_index=plan.bases_index,
+                build_on=plan.build_on,
+                build_on_index=plan.build_on_index,
+                stream_output=True,
+            )
+        except BaseException:
+            # set before the failure is seen, so no other plan is started meanwhile
+            stop.set()
+            raise
+
     def pack_charm_in_instance(
-        self, *, bases_index: int, build_on: Base, build_on_index: int
+        self, *, bases_index: int, build_on: Base, build_on_index: int, stream_output: bool = False
     ) -> str:
-        """Pack instance in Charm."""
+        """Pack instance in Charm.
+
+        If stream_output is set, the command's output inside the instance is streamed
+        through the emitter instead of pausing it, so several instances can run at once.
+        """
         charm_name = format_charm_file_name(self.config.name, self.config.bases[bases_index])
 
         # If building in project directory, use the project path as the working
@@ -350,6 +413,9 @@ class Builder:
         if self.force_packing:
             cmd.append("--force")
 
+        if self.compression != DEFAULT_ZIP_COMPRESSION:
+            cmd.append(f"--compression={self.compression}")
+
         if self.measure:
             instance_metrics = charmcraft.env.get_managed_environment_metrics_path()
             cmd.append(f"--measure={str(instance_metrics)}")
@@ -409,8 +475,18 @@ class Builder:
             emit.debug(f"Running {cmd}")
             try:
                 with charmcraft.instrum.Timer("Execution inside instance"):
-                    with emit.pause():
-                        instance.execute_run(cmd, check=True, cwd=instance_output_dir)
+                    if stream_output:
+                        with emit.open_stream(f"Packing for base {build_on}") as stream:
+                            instance.execute_run(
+                                cmd,
+                                check=True,
+                                cwd=instance_output_dir,
+                                stdout=stream,
+                                stderr=stream,
+                            )
+                    else:
+                        with emit.pause():
+                            instance.execute_run(cmd, check=True, cwd=instance_output_dir)
                     if self.measure:
                         with instance.temporarily_pull_file(instance_metrics) as local_filepath:
                             charmcraft.instrum.merge_from(local_filepath)
@@ -437,14 +513,7 @@ class Builder:
         """Handle the final package creation."""
         emit.progress("Creating the package itself")
         zipname = format_charm_file_name(self.config.name, bases_config)
-        zipfh = zipfile.ZipFile(zipname, "w", zipfile.ZIP_DEFLATED)
-        for dirpath, _dirnames, filenames in os.walk(prime_dir, followlinks=True):
-            dirpath = pathlib.Path(dirpath)
-            for filename in filenames:
-                filepath = dirpath / filename
-                zipfh.write(str(filepath), str(filepath.relative_to(prime_dir)))
-
-        zipfh.close()
+        build_zip(zipname, prime_dir, compression=self.compression)
         return zipname
 
     def _get_charm_pack_args(self, base_indeces: list[str], destructive_mode: bool) -> list[str]:
@@ -456,6 +525,8 @@ class Builder:
             args.append(f"--bases-index={base}")
         if self.force_packing:
             args.append("--force")
+        if self.compression != DEFAULT_ZIP_COMPRESSION:
+            args.append(f"--compression={self.compression}")
         return args
 
     def pack_bundle(
@@ -469,14 +540,16 @@ class Builder:
         """Pack a bundle."""
         if self._parts is None:
             self._parts = {"bundle": {"plugin": "bundle"}}
+        project = self.config.project
+        project_dir = project.dirpath
 
         if env.is_charmcraft_running_in_managed_mode():
             work_dir = env.get_managed_environment_home_path()
         else:
-            work_dir = self.config.project.dirpath / const.BUILD_DIRNAME
+            work_dir = project_dir / const.BUILD_DIRNAME
 
         # get the config files
-        bundle_filepath = self.config.project.dirpath / const.BUNDLE_FILENAME
+        bundle_filepath = project_dir / const.BUNDLE_FILENAME
         bundle = load_yaml(bundle_filepath)
         bundle_name = bundle.get("name")
         if not bundle_name:
@@ -498,7 +571,7 @@ class Builder:
         lifecycle = parts.PartsLifecycle(
             self._parts,
             work_dir=work_dir,
-            project_dir=self.config.project.dirpath,
+            project_dir=project_dir,
             project_name=bundle_name,
             ignore_local_sources=[bundle_name + ".zip"],
         )
@@ -508,16 +581,16 @@ class Builder:
         # pack everything
         create_manifest(
             lifecycle.prime_dir,
-            self.config.project.started_at,
+            project.started_at,
             bases_config=None,
             linting_results=[],
         )
-        zipname = self.config.project.dirpath / (bundle_name + ".zip")
+        zipname = project_dir / (bundle_name + ".zip")
         if overwrite:
             primed_bundle_path = lifecycle.prime_dir / const.BUNDLE_FILENAME
             with primed_bundle_path.open("w") as bundle_file:
                 yaml.safe_dump(bundle, bundle_file)
-        build_zip(zipname, lifecycle.prime_dir)
+        build_zip(zipname, lifecycle.prime_dir, compression=self.compression)
 
         return OutputFiles(charms=list(charms.values()), bundles=[zipname])
 
@@ -44,7 +44,15 @@ from charmcraft.utils.platform import (
     get_os_platform,
     validate_architectures,
 )
-from charmcraft.utils.file import S_IRALL, S_IXALL, make_executable, useful_filepath, build_zip
+from charmcraft.utils.file import (
+    DEFAULT_ZIP_COMPRESSION,
+    S_IRALL,
+    S_IXALL,
+    ZIP_COMPRESSIONS,
+    make_executable,
+    useful_filepath,
+    build_zip,
+)
 from charmcraft.utils.package import (
     get_pypi_packages,
     PACKAGE_LINE_REGEX,
@@ -61,7 +69,7 @@ from charmcraft.utils.project import (
     get_templates_environment,
 )
 from charmcraft.utils.store import get_packages
-from charmcraft.utils.yaml import dump_yaml, load_yaml
+from charmcraft.utils.yaml import HAVE_LIBYAML, dump_yaml, load_yaml
 
 __all__ = [
     "LibData",
@@ -78,8 +86,10 @@ __all__ = [
     "get_os_platform",
     "validate_architectures",
     "get_host_architecture",
+    "DEFAULT_ZIP_COMPRESSION",
     "S_IRALL",
     "S_IXALL",
+    "ZIP_COMPRESSIONS",
     "make_executable",
     "useful_filepath",
     "build_zip",
@@ -103,6 +113,7 @@ __all__ = [
     "get_charm_name_from_path",
     "get_templates_environment",
     "get_packages",
+    "HAVE_LIBYAML",
     "dump_yaml",
     "load_yaml",
 ]
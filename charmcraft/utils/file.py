@@ -14,13 +14,23 @@
 #
 # For further info, check https://github.com/canonical/charmcraft
 """File-related utilities."""
+import collections
+import contextlib
 import io
+import mmap
 import os
 import pathlib
+import shutil
+import tempfile
+import threading
+import time
 import zipfile
+import zlib
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from _stat import S_IRGRP, S_IROTH, S_IRUSR, S_IXGRP, S_IXOTH, S_IXUSR
-from craft_cli import CraftError
+from craft_cli import CraftError, emit
 
 # handy masks for execution and reading for everybody
 S_IXALL = S_IXUSR | S_IXGRP | S_IXOTH
@@ -28,6 +38,49 @@ S_IRALL = S_IRUSR | S_IRGRP | S_IROTH
 
 PathOrString = os.PathLike | str
 
+# buffer size used when reading files into a zip, much bigger than zipfile's default
+_COPY_BUFSIZE = 1 << 20
+
+# files smaller than this are read into memory at once, and files bigger than the
+# other are mapped to memory if compressed (streamed if stored); the ones in the
+# middle are read in chunks
+_SMALL_FILE_SIZE = 64 * 1024
+_MMAP_FILE_SIZE = 2 * 1024 * 1024
+
+# files bigger than this are compressed into temporary files that only keep up to the
+# other size in memory; the total size in memory of the files being compressed in
+# parallel is also limited
+_STREAM_FILE_SIZE = 16 * 1024 * 1024
+_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+_MAX_PENDING_SIZE = 64 * 1024 * 1024
+
+# timestamp for the zip's members when SOURCE_DATE_EPOCH is not set: the oldest one a
+# zip can hold (1980-01-01), so the archives are reproducible
+_DEFAULT_ZIP_EPOCH = 315532800
+
+# the newest timestamp a zip can hold (2107-12-31 23:59:58)
+_MAX_ZIP_EPOCH = 4354819198
+
+# a zip without members is just the end of central directory record, with everything
+# zeroed but its signature
+_EMPTY_ZIP = b"PK\x05\x06" + bytes(18)
+
+# the fixed part of a member's local header and central directory entry, which also
+# hold its name
+_ZIP_MEMBER_HEADERS_SIZE = 30 + 46
+
+# the compression methods that can be used for the zip files' members
+ZIP_COMPRESSIONS = ("deflate", "zstd", "store")
+DEFAULT_ZIP_COMPRESSION = "deflate"
+
+# per worker thread state, to not allocate a new read buffer for each file
+_thread_state = threading.local()
+
+# extensions of the files that are already compressed, which are stored as they are
+_INCOMPRESSIBLE_SUFFIXES = frozenset(
+    {"whl", "gz", "tgz", "bz2", "xz", "zst", "zip", "charm", "png", "jpg", "jpeg", "woff2"}
+)
+
 
 def make_executable(fh: io.IOBase) -> None:
     """Make open file fh executable.
@@ -55,16 +108,390 @@ def useful_filepath(filepath: PathOrString) -> pathlib.Path:
     return filepath
 
 
-def build_zip(zip_path: PathOrString, prime_dir: PathOrString) -> None:
+def _iter_files(root: str) -> Iterator[os.DirEntry]:
+    """Yield the entries for all the files under root, following symlinked directories.
+
+    A symlinked directory is not followed if it is one of its own ancestors (up to the
+    filesystem root, not only inside root), so links pointing back up do not loop.
+    """
+    root_path = pathlib.Path(root)
+    try:
+        stat = root_path.stat()
+    except OSError:
+        # like os.walk, ignore the directories that can't be listed
+        return
+    root_ids = {(stat.st_dev, stat.st_ino)}
+    for parent in root_path.parents:
+        with contextlib.suppress(OSError):
+            stat = parent.stat()
+            root_ids.add((stat.st_dev, stat.st_ino))
+
+    # each item is a directory to list and the (device, inode) of it and its ancestors
+    stack: list[tuple[str, frozenset[tuple[int, int]]]] = [(root, frozenset(root_ids))]
+    while stack:
+        path, ancestors = stack.pop()
+        try:
+            entries = os.scandir(path)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=True)
+                    if is_dir:
+                        stat = entry.stat()
+                    else:
+                        is_file = entry.is_file()
+                except OSError:
+                    # e.g. a symlink pointing to itself
+                    continue
+                if is_dir:
+                    dir_id = (stat.st_dev, stat.st_ino)
+                    if dir_id not in ancestors:
+                        stack.append((entry.path, ancestors | {dir_id}))
+                elif is_file:
+                    yield entry
+
+
+def _get_zstd_compress_type() -> int | None:
+    """Get the zipfile constant for Zstandard, if this Python can compress with it."""
+    # only available from Python 3.14, and even there the module may not be built
+    zstd_type = getattr(zipfile, "ZIP_ZSTANDARD", None)
+    if zstd_type is None:
+        return None
+    try:
+        zipfile._check_compression(zstd_type)
+    except (RuntimeError, NotImplementedError):
+        return None
+    return zstd_type
+
+
+def _get_compress_type(compression: str) -> int:
+    """Get the zipfile compression constant for the given compression method name."""
+    if compression == "store":
+        return zipfile.ZIP_STORED
+    if compression == "zstd":
+        zstd_type = _get_zstd_compress_type()
+        if zstd_type is not None:
+            emit.progress(
+                "Warning: the package is compressed with Zstandard, which Juju and "
+                "Charmhub may not support.",
+                permanent=True,
+            )
+            return zstd_type
+        emit.progress(
+            "Warning: Zstandard compression is not supported by this Python, using deflate.",
+            permanent=True,
+        )
+    elif compression != "deflate":
+        raise ValueError(f"Unknown zip compression {compression!r}.")
+    return zipfile.ZIP_DEFLATED
+
+
+def _get_member_compress_type(filename: str, compress_type: int) -> int:
+    """Get the compression for a file, not compressing again what is already compressed."""
+    _, dot, suffix = filename.rpartition(".")
+    if dot and suffix.lower() in _INCOMPRESSIBLE_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return compress_type
+
+
+def _get_zip_date_time() -> tuple[int, int, int, int, int, int]:
+    """Get the timestamp for all the members of a zip, honouring SOURCE_DATE_EPOCH."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch is None:
+        timestamp = _DEFAULT_ZIP_EPOCH
+    else:
+        try:
+            timestamp = int(epoch)
+        except ValueError:
+            raise CraftError(f"Invalid SOURCE_DATE_EPOCH value: {epoch!r}.") from None
+    # zip files can't hold older or newer timestamps
+    return time.gmtime(min(max(timestamp, _DEFAULT_ZIP_EPOCH), _MAX_ZIP_EPOCH))[:6]
+
+
+def _get_zip_info(
+    entry: os.DirEntry,
+    arcname: str,
+    compress_type: int,
+    date_time: tuple[int, int, int, int, int, int],
+) -> zipfile.ZipInfo:
+    """Build the zip member information for a file, as ZipFile.write would."""
+    stat = entry.stat()
+    info = zipfile.ZipInfo(arcname, date_time)
+    info.external_attr = (stat.st_mode & 0xFFFF) << 16
+    info.file_size = stat.st_size
+    info.compress_type = compress_type
+    return info
+
+
+def _get_read_buffer() -> memoryview:
+    """Get the buffer to read files into, allocated once per worker thread."""
+    buffer = getattr(_thread_state, "read_buffer", None)
+    if buffer is None:
+        buffer = _thread_state.read_buffer = memoryview(bytearray(_COPY_BUFSIZE))
+    return buffer
+
+
+def _compress_content(content: bytes | mmap.mmap, compressor) -> tuple[int, int, bytes]:
+    """Compress a whole file's content, that is already in memory or mapped to it."""
+    crc = zlib.crc32(content)
+    if compressor is None:
+        # only the files read into memory are stored here, the mapped ones are compressed
+        return crc, len(content), content
+    return crc, len(content), compressor.compress(content) + compressor.flush()
+
+
+def _compress_file(path: str, compress_type: int, size_hint: int) -> tuple[int, int, bytes]:
+    """Compress a file's content as it would be stored in a zip.
+
+    :returns: the CRC and size of the original content, and the compressed content.
+    """
+    # the same compressor that zipfile would use (None if storing)
+    compressor = zipfile._get_compressor(compress_type)
+
+    if size_hint < _SMALL_FILE_SIZE:
+        # read it skipping Python's io layers, in one go unless it changed since the
+        # walk (so it's read until the end anyway, not trusting the size seen then);
+        # in binary mode where that matters, as in Windows
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            chunks = []
+            while chunk := os.read(fd, _SMALL_FILE_SIZE):
+                chunks.append(chunk)
+        finally:
+            os.close(fd)
+        return _compress_content(b"".join(chunks), compressor)
+
+    with open(path, "rb", buffering=0) as fh:
+        if compressor is not None and size_hint >= _MMAP_FILE_SIZE:
+            # map big files so their content is not copied around while compressing
+            try:
+                mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # not supported by the filesystem, or the file was emptied meanwhile
+                pass
+            else:
+                with mapped:
+                    return _compress_content(mapped, compressor)
+
+        buffer = _get_read_buffer()
+        crc = size = 0
+        chunks = []
+        while count := fh.readinto(buffer):
+            data = buffer[:count]
+            crc = zlib.crc32(data, crc)
+            size += count
+            chunks.append(bytes(data) if compressor is None else compressor.compress(data))
+    if compressor is not None:
+        chunks.append(compressor.flush())
+    return crc, size, b"".join(chunks)
+
+
+def _compress_file_spooled(
+    path: str, compress_type: int
+) -> tuple[int, int, tempfile.SpooledTemporaryFile]:
+    """Compress a big file's content into a temporary file, as it would be stored in a zip.
+
+    Only the beginning of the compressed content is kept in memory, the rest goes to disk.
+
+    :returns: the CRC and size of the original content, and the compressed content.
+    """
+    # the same compressor that zipfile would use (None if storing)
+    compressor = zipfile._get_compressor(compress_type)
+    spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+    try:
+        buffer = _get_read_buffer()
+        crc = size = 0
+        with open(path, "rb", buffering=0) as fh:
+            while count := fh.readinto(buffer):
+                data = buffer[:count]
+                crc = zlib.crc32(data, crc)
+                size += count
+                spool.write(data if compressor is None else compressor.compress(data))
+        if compressor is not None:
+            spool.write(compressor.flush())
+    except BaseException:
+        spool.close()
+        raise
+    return crc, size, spool
+
+
+def _write_compressed(
+    zip_file: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    crc: int,
+    size: int,
+    data: bytes | tempfile.SpooledTemporaryFile,
+) -> None:
+    """Append an already compressed member to a zip file open for writing.
+
+    This mimics what ZipFile.writestr does, but without compressing again. The data is
+    the compressed content, or a temporary file holding it (which is closed).
+    """
+    info.CRC = crc
+    info.file_size = size
+    if isinstance(data, bytes):
+        info.compress_size = len(data)
+    else:
+        info.compress_size = data.tell()
+        data.seek(0)
+    zip_file._writecheck(info)
+    info.header_offset = zip_file.fp.tell()
+    zip_file.fp.write(info.FileHeader())
+    if isinstance(data, bytes):
+        zip_file.fp.write(data)
+    else:
+        with data:
+            shutil.copyfileobj(data, zip_file.fp, _COPY_BUFSIZE)
+    zip_file.filelist.append(info)
+    zip_file.NameToInfo[info.filename] = info
+    zip_file.start_dir = zip_file.fp.tell()
+
+
+def _stream_member(zip_file: zipfile.ZipFile, path: str, info: zipfile.ZipInfo) -> None:
+    """Copy a file into the zip through a big buffer, never holding it all in memory."""
+    with open(path, "rb") as src, zip_file.open(info, "w") as dest:
+        shutil.copyfileobj(src, dest, _COPY_BUFSIZE)
+
+
+def _write_members(zip_file: zipfile.ZipFile, members: list[tuple[str, zipfile.ZipInfo]]) -> None:
+    """Write the files to the zip, compressing them in parallel.
+
+    The big files that are just stored go first, as there is no work to share for them:
+    they are copied straight into the zip while the rest start to be compressed. The
+    rest are written in the given order, as they get ready.
+    """
+    direct = []
+    queued = []
+    for member in members:
+        _, info = member
+        if info.compress_type == zipfile.ZIP_STORED and info.file_size >= _MMAP_FILE_SIZE:
+            direct.append(member)
+        else:
+            queued.append(member)
+
+    # limit how many compressed files, and how much memory they take, are held
+    # waiting to be written
+    workers = os.cpu_count() or 1
+    max_pending = workers * 2
+    pending: collections.deque[tuple[zipfile.ZipInfo, int, Future]] = collections.deque()
+    pending_size = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, info in queued:
+            if info.file_size >= _STREAM_FILE_SIZE:
+                future = executor.submit(_compress_file_spooled, path, info.compress_type)
+                in_memory = _SPOOL_MAX_SIZE
+            else:
+                future = executor.submit(_compress_file, path, info.compress_type, info.file_size)
+                in_memory = info.file_size
+            pending.append((info, in_memory, future))
+            pending_size += in_memory
+            window_full = len(pending) >= max_pending or pending_size >= _MAX_PENDING_SIZE
+
+            if direct:
+                if not window_full:
+                    # keep giving work to the pool before copying the files
+                    continue
+                for direct_path, direct_info in direct:
+                    _stream_member(zip_file, direct_path, direct_info)
+                direct = []
+
+            while pending and (
+                len(pending) >= max_pending
+                or pending_size >= _MAX_PENDING_SIZE
+                or pending[0][2].done()
+            ):
+                pending_info, in_memory, future = pending.popleft()
+                pending_size -= in_memory
+                _write_compressed(zip_file, pending_info, *future.result())
+
+        for direct_path, direct_info in direct:
+            _stream_member(zip_file, direct_path, direct_info)
+        for pending_info, _, future in pending:
+            _write_compressed(zip_file, pending_info, *future.result())
+
+
+def _preallocate(fh: io.IOBase, size: int) -> None:
+    """Reserve disk space for a file beforehand, so it's less fragmented when written.
+
+    Where the filesystem can't reserve it, the C library emulates this by writing to
+    each block, so the size should not be more than what will be written anyway.
+    """
+    if size and hasattr(os, "posix_fallocate"):
+        # not a problem if the platform doesn't support it
+        with contextlib.suppress(OSError):
+            os.posix_fallocate(fh.fileno(), 0, size)
+
+
+def _estimate_zip_size(members: list[tuple[str, zipfile.ZipInfo]]) -> int:
+    """Estimate the size of a zip with the given members, never going over it.
+
+    The members' headers and the content of the stored ones are counted, but not the
+    content of the compressed ones, as how big it ends up is not known.
+    """
+    size = len(_EMPTY_ZIP)
+    for _, info in members:
+        size += _ZIP_MEMBER_HEADERS_SIZE + 2 * len(info.filename.encode())
+        if info.compress_type == zipfile.ZIP_STORED:
+            size += info.file_size
+    return size
+
+
+def build_zip(
+    zip_path: PathOrString,
+    prime_dir: PathOrString,
+    *,
+    compression: str = DEFAULT_ZIP_COMPRESSION,
+) -> None:
     """Build a zip file from a prime directory.
 
+    The files are compressed in parallel (the compressors release the GIL while
+    working), biggest first so no worker is left alone with a big file at the end,
+    and written to the zip in that order as they get ready; the big ones are
+    compressed into temporary files so they are never held in memory. Files that are
+    already compressed (wheels, tarballs, images, etc.) are just stored, the big ones
+    being copied first. Symlinked directories are followed, unless they point to a
+    directory that contains them.
+
+    All the members get the same timestamp, from SOURCE_DATE_EPOCH if set, so the
+    produced zip only depends on the files' names, modes and content.
+
     :param zip_path: The path to the output zip file
     :param prime_dir: The path to the directory to zip.
+    :param compression: The compression method for the files, one of ZIP_COMPRESSIONS;
+        Zstandard falls back to deflate if not supported by the running Python.
     """
+    compress_type = _get_compress_type(compression)
     zip_path = pathlib.Path(zip_path).resolve()
-    prime_dir = pathlib.Path(prime_dir).resolve()
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as file:
-        for file_path in prime_dir.rglob("*"):
-            if not file_path.is_file():
-                continue
-            file.write(file_path, file_path.relative_to(prime_dir))
+    prime_str = os.fspath(pathlib.Path(prime_dir).resolve())
+    # the arcname is the path relative to the prime dir, without the separator
+    prime_len = len(prime_str.rstrip(os.sep)) + 1
+
+    date_time = _get_zip_date_time()
+    members = []
+    for entry in _iter_files(prime_str):
+        member_type = _get_member_compress_type(entry.name, compress_type)
+        info = _get_zip_info(entry, entry.path[prime_len:], member_type, date_time)
+        members.append((entry.path, info))
+    if not members:
+        zip_path.write_bytes(_EMPTY_ZIP)
+        return
+    members.sort(key=lambda member: (-member[1].file_size, member[1].filename))
+
+    # a big write buffer so the many small members are written in a few calls
+    zip_fh = zip_path.open("wb", buffering=_COPY_BUFSIZE)
+    try:
+        with zip_fh:
+            # reserve what the zip will take at least; the rest is just allocated when
+            # written
+            _preallocate(zip_fh, _estimate_zip_size(members))
+            with zipfile.ZipFile(zip_fh, "w", compress_type) as file:
+                _write_members(file, members)
+            # release the space that was reserved but not used
+            zip_fh.truncate()
+    except BaseException:
+        # do not leave a truncated zip around that could be taken as a good one
+        zip_path.unlink(missing_ok=True)
+        raise
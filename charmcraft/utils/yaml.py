@@ -19,6 +19,14 @@ from typing import Any
 import yaml
 from craft_cli import emit
 
+# use the libyaml based loader when available, as it's several times faster
+HAVE_LIBYAML: bool = yaml.__with_libyaml__
+_SafeLoader = yaml.CSafeLoader if HAVE_LIBYAML else yaml.SafeLoader
+
+# buffer size for reading YAML files: big enough to not call the OS repeatedly
+# for the usual files, small enough to not waste time filling it
+_READ_BUFSIZE = 64 * 1024
+
 
 def load_yaml(fpath) -> dict[str, Any] | None:
     """Return the content of a YAML file."""
@@ -26,8 +34,8 @@ def load_yaml(fpath) -> dict[str, Any] | None:
         emit.debug(f"Couldn't find config file {str(fpath)!r}")
         return None
     try:
-        with fpath.open("r") as fh:
-            content = yaml.safe_load(fh)
+        with fpath.open("rb", buffering=_READ_BUFSIZE) as fh:
+            content = yaml.load(fh, Loader=_SafeLoader)  # noqa: S506: it is a safe loader
     except (yaml.error.YAMLError, OSError) as err:
         emit.debug(f"Failed to read/parse config file {str(fpath)!r}: {err!r}")
         return None
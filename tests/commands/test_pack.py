@@ -50,6 +50,8 @@ def get_namespace(
     include_all_charms: bool = False,
     include_charm: list[pathlib.Path] | None = None,
     output_bundle: pathlib.Path | None = None,
+    compression="deflate",
+    jobs=1,
 ):
     if bases_index is None:
         bases_index = []
@@ -66,6 +68,8 @@ def get_namespace(
         include_all_charms=include_all_charms,
         include_charm=include_charm,
         output_bundle=output_bundle,
+        compression=compression,
+        jobs=jobs,
     )
 
 
@@ -319,6 +323,17 @@ def test_bundle_missing_other_mandatory_file(tmp_path, bundle_config, bundle_yam
     assert str(cm.value) == "Missing mandatory file: {!r}.".format(str(tmp_path / "README.md"))
 
 
+def test_bundle_unlistable_project_dir(tmp_path, bundle_config, bundle_yaml):
+    """An unlistable project directory is not reported as missing files."""
+    bundle_yaml(name="testbundle")
+    bundle_config.set(type="bundle")
+    (tmp_path / "README.md").touch()
+
+    with patch("os.scandir", side_effect=PermissionError("not allowed")):
+        with pytest.raises(PermissionError):
+            PackCommand(bundle_config).run(noargs)
+
+
 @pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
 def test_bundle_missing_name_in_bundle(tmp_path, bundle_yaml, bundle_config):
     """Can not build a bundle without name."""
@@ -903,6 +918,8 @@ def test_charm_builder_infrastructure_called(config, tmp_path):
         shell=True,
         shell_after=True,
         measure=measure_filepath,
+        compression="store",
+        jobs=3,
     )
     config.set(type="charm")
     with patch("charmcraft.package.Builder") as builder_class_mock:
@@ -915,6 +932,8 @@ def test_charm_builder_infrastructure_called(config, tmp_path):
         shell_after=True,
         shell=True,
         measure=measure_filepath,
+        compression="store",
+        jobs=3,
     )
     builder_instance_mock.run.assert_called_with([], destructive_mode=True)
 
@@ -1021,3 +1040,15 @@ def test_validator_bases_index_invalid(bases_indices, bad_index, config):
             f"Bases index '{bad_index}' is invalid (must be >= 0 and fit in configured bases)."
         )
         assert str(exc_cm.value) == expected_msg
+
+
+@pytest.mark.parametrize("jobs", [0, -2])
+def test_charm_jobs_invalid(config, jobs):
+    """The number of jobs must be positive."""
+    config.set(type="charm")
+    args = get_namespace(jobs=jobs)
+
+    with patch("charmcraft.package.Builder"):
+        with pytest.raises(ArgumentParsingError) as exc_cm:
+            PackCommand(config).run(args)
+    assert str(exc_cm.value) == f"--jobs must be at least 1, got {jobs}."
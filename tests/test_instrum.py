@@ -17,6 +17,7 @@
 """Tests for the instrumentator module."""
 
 import json
+import threading
 from unittest.mock import patch
 
 import pytest
@@ -113,6 +114,61 @@ def test_measurement_overlapped_measurements():
         measurements.end(mid_1)
 
 
+def test_measurement_threads():
+    """Measurements in different threads do not overlap each other."""
+    measurements = _Measurements()
+    mid_main = measurements.start("main msg", {})
+
+    started = threading.Barrier(2)
+    thread_mids = []
+
+    def _measure():
+        mid = measurements.start("thread msg", {})
+        thread_mids.append(mid)
+        started.wait()
+        measurements.end(mid)
+        assert measurements.parents == [None]
+
+    threads = [threading.Thread(target=_measure) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert measurements.parents == [None, mid_main]
+    measurements.end(mid_main)
+    assert len(thread_mids) == 2
+    for mid in thread_mids:
+        assert measurements.measurements[mid]["parent"] is None
+        assert measurements.measurements[mid]["tend"] is not None
+
+
+def test_measurement_threads_hooked():
+    """Measurements in a thread can be hooked under one from another thread."""
+    measurements = _Measurements()
+    mid_main = measurements.start("main msg", {})
+    assert measurements.get_current() == mid_main
+
+    thread_mids = []
+
+    def _measure():
+        assert measurements.get_current() is None
+        measurements.set_current(mid_main)
+        mid = measurements.start("thread msg", {})
+        thread_mids.append(mid)
+        measurements.end(mid)
+        assert measurements.parents == [mid_main]
+
+    thread = threading.Thread(target=_measure)
+    thread.start()
+    thread.join()
+
+    measurements.end(mid_main)
+    assert measurements.get_current() is None
+    (mid,) = thread_mids
+    assert measurements.measurements[mid]["parent"] == mid_main
+
+
 def test_measurement_dump(tmp_path, fake_times):
     """Dump the measurements content to a dump file."""
     measurements = _Measurements()
@@ -18,6 +18,7 @@ import pathlib
 import re
 import subprocess
 import sys
+import threading
 import zipfile
 from textwrap import dedent
 from unittest import mock
@@ -53,6 +54,8 @@ def get_builder(
     shell=False,
     shell_after=False,
     measure=None,
+    compression="deflate",
+    jobs=1,
 ):
     if project_dir is None:
         project_dir = config.project.dirpath
@@ -64,6 +67,8 @@ def get_builder(
         shell=shell,
         shell_after=shell_after,
         measure=measure,
+        compression=compression,
+        jobs=jobs,
     )
 
 
@@ -1182,6 +1187,158 @@ def test_build_arguments_managed_charmcraft_measure(
     ]
 
 
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_build_arguments_managed_charmcraft_compression(
+    mock_capture_logs_from_instance,
+    mock_instance,
+    basic_project_builder,
+):
+    """The compression method is passed to charmcraft inside the environment."""
+    emit.set_mode(EmitterMode.BRIEF)
+    host_base = Base(name="ubuntu", channel="18.04", architectures=[get_host_architecture()])
+    bases_config = [BasesConfiguration(**{"build-on": [host_base], "run-on": [host_base]})]
+    project_managed_path = pathlib.Path("/root/project")
+
+    builder = basic_project_builder(bases_config, compression="store")
+    builder.pack_charm_in_instance(
+        build_on=bases_config[0].build_on[0],
+        bases_index=0,
+        build_on_index=0,
+    )
+    cmd_flag = "--compression=store"
+    expected_cmd = ["charmcraft", "pack", "--bases-index", "0", "--verbosity=brief", cmd_flag]
+    assert mock_instance.mock_calls == [
+        call.mount(host_source=builder.config.project.dirpath, target=project_managed_path),
+        call.execute_run(expected_cmd, check=True, cwd=project_managed_path),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("jobs", "builder_flags", "stream_output"),
+    [
+        (1, {}, False),
+        (2, {}, True),
+        (2, {"debug": True}, False),
+        (2, {"shell_after": True}, False),
+    ],
+)
+def test_build_multiple_jobs_provider(
+    basic_project_builder,
+    mock_provider,
+    mock_is_base_available,
+    jobs,
+    builder_flags,
+    stream_output,
+):
+    """Bases are packed in their instances at the same time only if more than one job is used."""
+    host_base = get_host_as_base()
+    run_on_bases = [
+        Base(name="ubuntu", channel=channel, architectures=host_base.architectures)
+        for channel in ("18.04", "20.04", "22.04")
+    ]
+    bases_config = [
+        BasesConfiguration(**{"build-on": [base], "run-on": [base]}) for base in run_on_bases
+    ]
+    builder = basic_project_builder(bases_config, jobs=jobs, **builder_flags)
+
+    # the measurements done while packing each base belong to the builder's run
+    measurement_parents = []
+
+    def _pack(**kwargs):
+        measurement_parents.append(instrum.get_current())
+        return f"charm-{kwargs['bases_index']}.charm"
+
+    with patch.object(builder, "pack_charm_in_instance", side_effect=_pack) as mock_pack:
+        zipnames = builder.run()
+
+    assert zipnames == ["charm-0.charm", "charm-1.charm", "charm-2.charm"]
+    assert len(measurement_parents) == 3
+    assert len(set(measurement_parents)) == 1
+    assert measurement_parents[0] is not None
+    assert instrum._measurements.measurements[measurement_parents[0]]["msg"] == "Builder run"
+    expected_calls = [
+        call(bases_index=index, build_on=base, build_on_index=0)
+        for index, base in enumerate(run_on_bases)
+    ]
+    if stream_output:
+        expected_calls = [
+            call(**expected.kwargs, stream_output=True) for expected in expected_calls
+        ]
+    assert sorted(mock_pack.mock_calls, key=lambda c: c.kwargs["bases_index"]) == expected_calls
+
+
+def test_build_multiple_jobs_provider_error(
+    basic_project_builder,
+    mock_provider,
+    mock_is_base_available,
+):
+    """If a base fails to be packed in parallel, the ones still waiting are not packed."""
+    host_base = get_host_as_base()
+    run_on_bases = [
+        Base(name="ubuntu", channel=channel, architectures=host_base.architectures)
+        for channel in ("18.04", "20.04", "22.04", "24.04")
+    ]
+    bases_config = [
+        BasesConfiguration(**{"build-on": [base], "run-on": [base]}) for base in run_on_bases
+    ]
+    builder = basic_project_builder(bases_config, jobs=2)
+    pack_plan = builder._pack_plan_in_instance
+    stop_events = []
+    second_started = threading.Event()
+
+    def _pack_plan(plan, measurement_id, stop):
+        stop_events.append(stop)
+        return pack_plan(plan, measurement_id, stop)
+
+    def _pack(**kwargs):
+        if kwargs["bases_index"] == 0:
+            assert second_started.wait(timeout=10)
+            raise CraftError("boom")
+        # the other job is still busy when the first one fails
+        second_started.set()
+        assert stop_events[0].wait(timeout=10)
+        return f"charm-{kwargs['bases_index']}.charm"
+
+    with (
+        patch.object(builder, "_pack_plan_in_instance", side_effect=_pack_plan),
+        patch.object(builder, "pack_charm_in_instance", side_effect=_pack) as mock_pack,
+        pytest.raises(CraftError, match="boom"),
+    ):
+        builder.run()
+
+    packed = sorted(c.kwargs["bases_index"] for c in mock_pack.mock_calls)
+    assert packed == [0, 1]
+
+
+def test_build_arguments_managed_charmcraft_stream_output(
+    mock_capture_logs_from_instance,
+    mock_instance,
+    basic_project_builder,
+):
+    """The output inside the environment is streamed instead of pausing the emitter."""
+    emit.set_mode(EmitterMode.BRIEF)
+    host_base = Base(name="ubuntu", channel="18.04", architectures=[get_host_architecture()])
+    bases_config = [BasesConfiguration(**{"build-on": [host_base], "run-on": [host_base]})]
+    project_managed_path = pathlib.Path("/root/project")
+
+    builder = basic_project_builder(bases_config)
+    with patch.object(emit, "open_stream") as mock_open_stream:
+        stream = mock_open_stream.return_value.__enter__.return_value
+        builder.pack_charm_in_instance(
+            build_on=bases_config[0].build_on[0],
+            bases_index=0,
+            build_on_index=0,
+            stream_output=True,
+        )
+    expected_cmd = ["charmcraft", "pack", "--bases-index", "0", "--verbosity=brief"]
+    assert mock_instance.mock_calls == [
+        call.mount(host_source=builder.config.project.dirpath, target=project_managed_path),
+        call.execute_run(
+            expected_cmd, check=True, cwd=project_managed_path, stdout=stream, stderr=stream
+        ),
+    ]
+
+
 @pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
 def test_build_package_tree_structure(new_path, config):
     """The zip file is properly built internally."""
@@ -1725,14 +1882,16 @@ def test_show_linters_lint_errors_forced(basic_project, emitter, config):
 @pytest.mark.parametrize("force", [True, False])
 @pytest.mark.parametrize("destructive_mode", [True, False])
 @pytest.mark.parametrize("base_indeces", [[], [1], [1, 2, 3, 4, 5]])
-def test_get_charm_pack_args(config, force, base_indeces, destructive_mode):
-    builder = get_builder(config, force=force)
+@pytest.mark.parametrize("compression", ["deflate", "store"])
+def test_get_charm_pack_args(config, force, base_indeces, destructive_mode, compression):
+    builder = get_builder(config, force=force, compression=compression)
 
     actual = builder._get_charm_pack_args(base_indeces, destructive_mode)
 
     assert actual[:3] == ["charmcraft", "pack", "--verbose"]
     assert ("--force" in actual) == force
     assert ("--destructive-mode" in actual) == destructive_mode
+    assert ("--compression=store" in actual) == (compression == "store")
     for index in base_indeces:
         assert f"--bases-index={index}" in actual
 
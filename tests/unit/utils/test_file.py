@@ -18,10 +18,13 @@ import os
 import pathlib
 import sys
 import zipfile
+import zlib
+from unittest import mock
 
 import pytest
 from craft_cli import CraftError
 
+from charmcraft.utils import file as file_utils
 from charmcraft.utils.file import build_zip, make_executable, useful_filepath
 
 
@@ -143,3 +146,485 @@ def test_zipbuild_symlink_outside(tmp_path):
     zf = zipfile.ZipFile(zip_filepath)
     assert sorted(x.filename for x in zf.infolist()) == ["link.txt"]
     assert zf.read("link.txt") == b"123\x00456"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_zipbuild_symlink_directory(tmp_path):
+    """Symlinked directories are followed."""
+    # outside the build dir
+    outside_dir = tmp_path / "outside"
+    outside_dir.mkdir()
+    (outside_dir / "real.txt").write_bytes(b"123\x00456")
+
+    # inside the build dir
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    (build_dir / "linkeddir").symlink_to(outside_dir)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert sorted(x.filename for x in zf.infolist()) == ["linkeddir/real.txt"]
+    assert zf.read("linkeddir/real.txt") == b"123\x00456"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_zipbuild_symlink_directory_loop(tmp_path):
+    """Symlinks to an ancestor directory are not followed."""
+    build_dir = tmp_path / "somedir"
+    subdir = build_dir / "subdir"
+    subdir.mkdir(parents=True)
+    (subdir / "real.txt").write_bytes(b"123\x00456")
+    (tmp_path / "sibling.txt").write_text("not inside the built dir")
+    (build_dir / "up").symlink_to("..")
+    (build_dir / "here").symlink_to(".")
+    (subdir / "up").symlink_to("..")
+    (subdir / "again").symlink_to("../subdir")
+    (subdir / "self").symlink_to("self")
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert sorted(x.filename for x in zf.infolist()) == ["subdir/real.txt"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows not [yet] supported")
+def test_zipbuild_permissions(tmp_path):
+    """File permissions are kept in the zip."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+
+    testfile1 = build_dir / "dispatch"
+    testfile1.write_bytes(b"#!/bin/sh\n")
+    testfile1.chmod(0o755)
+    testfile2 = build_dir / "foo.txt"
+    testfile2.write_bytes(b"123\x00456")
+    testfile2.chmod(0o644)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.getinfo("dispatch").external_attr >> 16 & 0o777 == 0o755
+    assert zf.getinfo("foo.txt").external_attr >> 16 & 0o777 == 0o644
+    assert zf.read("dispatch") == b"#!/bin/sh\n"
+
+
+def test_zipbuild_missing_directory(tmp_path):
+    """A missing prime directory produces an empty zip."""
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, tmp_path / "missing")
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.infolist() == []
+
+
+def test_zipbuild_empty_directory(tmp_path):
+    """An empty prime directory produces just the end of central directory record."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    (build_dir / "emptysubdir").mkdir()
+    zip_filepath = tmp_path / "testresult.zip"
+    with mock.patch("zipfile.ZipFile") as mock_zipfile:
+        build_zip(zip_filepath, build_dir)
+    mock_zipfile.assert_not_called()
+
+    with zipfile.ZipFile(zip_filepath) as zf:
+        assert zf.infolist() == []
+    assert zip_filepath.stat().st_size == 22
+
+
+def test_zipbuild_error_removes_zip(tmp_path):
+    """A zip that could not be completely written is not left behind."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    (build_dir / "foo.txt").write_text("foo")
+    zip_filepath = tmp_path / "testresult.zip"
+
+    with (
+        mock.patch("charmcraft.utils.file._write_members", side_effect=OSError("disk full")),
+        pytest.raises(OSError, match="disk full"),
+    ):
+        build_zip(zip_filepath, build_dir)
+    assert not zip_filepath.exists()
+
+
+def test_zipbuild_open_error_keeps_file(tmp_path):
+    """A file already in the zip's place is not removed if it can't be opened."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    (build_dir / "foo.txt").write_text("foo")
+    zip_filepath = tmp_path / "testresult.zip"
+    zip_filepath.write_bytes(b"previous content")
+
+    with (
+        mock.patch("pathlib.Path.open", side_effect=PermissionError("not allowed")),
+        pytest.raises(PermissionError, match="not allowed"),
+    ):
+        build_zip(zip_filepath, build_dir)
+    assert zip_filepath.read_bytes() == b"previous content"
+
+
+def test_zipbuild_many_files(tmp_path):
+    """All the files are zipped with their own content, more than the ones compressed at once."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    count = (os.cpu_count() or 1) * 10
+    for idx in range(count):
+        (build_dir / f"file-{idx}.txt").write_bytes(b"content %d " % idx * idx)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.testzip() is None
+    assert len(zf.infolist()) == count
+    for idx in range(count):
+        assert zf.read(f"file-{idx}.txt") == b"content %d " % idx * idx
+
+
+@pytest.mark.parametrize(
+    ("compression", "compress_type"),
+    [
+        ("deflate", zipfile.ZIP_DEFLATED),
+        ("store", zipfile.ZIP_STORED),
+    ],
+)
+def test_zipbuild_compression(tmp_path, compression, compress_type):
+    """The files are compressed with the indicated method."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    testfile = build_dir / "foo.txt"
+    testfile.write_bytes(b"123\x00456" * 100)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir, compression=compression)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.getinfo("foo.txt").compress_type == compress_type
+    assert zf.read("foo.txt") == b"123\x00456" * 100
+
+
+def test_zipbuild_compression_zstd(tmp_path, emitter):
+    """Zstandard is used if supported by the running Python, deflate otherwise."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    testfile = build_dir / "foo.txt"
+    testfile.write_bytes(b"123\x00456" * 100)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir, compression="zstd")
+
+    zf = zipfile.ZipFile(zip_filepath)
+    expected = file_utils._get_zstd_compress_type() or zipfile.ZIP_DEFLATED
+    assert zf.getinfo("foo.txt").compress_type == expected
+    assert zf.read("foo.txt") == b"123\x00456" * 100
+    if expected == zipfile.ZIP_DEFLATED:
+        emitter.assert_progress(
+            "Warning: Zstandard compression is not supported by this Python, using deflate.",
+            permanent=True,
+        )
+    else:
+        emitter.assert_progress(
+            "Warning: the package is compressed with Zstandard, which Juju and "
+            "Charmhub may not support.",
+            permanent=True,
+        )
+
+
+def test_zipbuild_compression_zstd_module_missing(tmp_path, emitter, monkeypatch):
+    """Deflate is used if zipfile knows Zstandard but its module is not available."""
+    monkeypatch.setattr(zipfile, "ZIP_ZSTANDARD", 93, raising=False)
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    (build_dir / "foo.txt").write_bytes(b"123\x00456" * 100)
+
+    check_compression = zipfile._check_compression
+
+    def fake_check_compression(compression):
+        if compression == 93:
+            raise RuntimeError("Compression requires the (missing) compression.zstd module")
+        check_compression(compression)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    with mock.patch.object(zipfile, "_check_compression", fake_check_compression):
+        build_zip(zip_filepath, build_dir, compression="zstd")
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.getinfo("foo.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert zf.read("foo.txt") == b"123\x00456" * 100
+    emitter.assert_progress(
+        "Warning: Zstandard compression is not supported by this Python, using deflate.",
+        permanent=True,
+    )
+
+
+@pytest.mark.parametrize(
+    ("filename", "compress_type"),
+    [
+        ("foo.txt", zipfile.ZIP_DEFLATED),
+        ("foo", zipfile.ZIP_DEFLATED),
+        ("whl", zipfile.ZIP_DEFLATED),
+        ("foo.whl", zipfile.ZIP_STORED),
+        ("foo.tar.gz", zipfile.ZIP_STORED),
+        ("foo.PNG", zipfile.ZIP_STORED),
+        ("other.charm", zipfile.ZIP_STORED),
+    ],
+)
+def test_zipbuild_already_compressed(tmp_path, filename, compress_type):
+    """Files that are already compressed are stored as they are."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    testfile = build_dir / filename
+    testfile.write_bytes(b"123\x00456" * 100)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.getinfo(filename).compress_type == compress_type
+    assert zf.read(filename) == b"123\x00456" * 100
+
+
+@pytest.mark.parametrize("size", [0, 1, 64 * 1024 - 1, 64 * 1024, 3 * 1024 * 1024 + 1])
+def test_zipbuild_file_sizes(tmp_path, size):
+    """Files are zipped properly, whatever their size."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    content = (b"0123456789abcdef" * (size // 16 + 1))[:size]
+    testfile = build_dir / "foo.bin"
+    testfile.write_bytes(content)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.testzip() is None
+    assert zf.getinfo("foo.bin").file_size == size
+    assert zf.read("foo.bin") == content
+
+
+def test_zipbuild_stable_order(tmp_path):
+    """The order of the files in the zip doesn't depend on how they were created."""
+    names = ["b.txt", "a.txt", "sub/c.txt", "sub/a.txt", "big.txt"]
+    zip_filepaths = []
+    for idx, creation_order in enumerate([names, names[::-1]]):
+        build_dir = tmp_path / f"somedir{idx}"
+        for name in creation_order:
+            path = build_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x" * (100 if name == "big.txt" else 10))
+        zip_filepath = tmp_path / f"testresult{idx}.zip"
+        build_zip(zip_filepath, build_dir)
+        zip_filepaths.append(zip_filepath)
+
+    orders = [[x.filename for x in zipfile.ZipFile(zfp).infolist()] for zfp in zip_filepaths]
+    assert orders[0] == orders[1] == ["big.txt", "a.txt", "b.txt", "sub/a.txt", "sub/c.txt"]
+
+
+def test_zipbuild_reproducible(tmp_path):
+    """The zip doesn't depend on the files' timestamps."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    testfile = build_dir / "foo.txt"
+    testfile.write_bytes(b"123\x00456")
+
+    zip_filepath_1 = tmp_path / "testresult1.zip"
+    build_zip(zip_filepath_1, build_dir)
+    os.utime(testfile, (1700000000, 1700000000))
+    zip_filepath_2 = tmp_path / "testresult2.zip"
+    build_zip(zip_filepath_2, build_dir)
+
+    assert zip_filepath_1.read_bytes() == zip_filepath_2.read_bytes()
+    zf = zipfile.ZipFile(zip_filepath_1)
+    assert zf.getinfo("foo.txt").date_time == (1980, 1, 1, 0, 0, 0)
+
+
+@pytest.mark.parametrize(
+    ("epoch", "date_time"),
+    [
+        ("1700000000", (2023, 11, 14, 22, 13, 20)),
+        ("0", (1980, 1, 1, 0, 0, 0)),
+        ("4354819198", (2107, 12, 31, 23, 59, 58)),
+        ("5000000000", (2107, 12, 31, 23, 59, 58)),
+    ],
+)
+def test_zipbuild_source_date_epoch(tmp_path, monkeypatch, epoch, date_time):
+    """The members' timestamp comes from SOURCE_DATE_EPOCH if set."""
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", epoch)
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    (build_dir / "foo.txt").write_bytes(b"123\x00456")
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.getinfo("foo.txt").date_time == date_time
+
+
+def test_zipbuild_source_date_epoch_invalid(tmp_path, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "yesterday")
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+
+    with pytest.raises(CraftError) as cm:
+        build_zip(tmp_path / "testresult.zip", build_dir)
+    assert str(cm.value) == "Invalid SOURCE_DATE_EPOCH value: 'yesterday'."
+
+
+@pytest.mark.parametrize("size_hint", [0, 3, 100])
+def test_zipbuild_small_file_changed(tmp_path, size_hint):
+    """Small files are read completely, even if their size changed since the walk."""
+    testfile = tmp_path / "foo.txt"
+    testfile.write_bytes(b"123\x00456" * 3)
+
+    crc, size, data = file_utils._compress_file(str(testfile), zipfile.ZIP_STORED, size_hint)
+    assert size == 21
+    assert data == b"123\x00456" * 3
+    assert crc == zlib.crc32(data)
+
+
+def test_zipbuild_small_file_binary(tmp_path):
+    """Small files are read as they are, without translating line ends or stopping at EOF."""
+    content = b"line\r\nother\x1a\nmore\rend"
+    testfile = tmp_path / "foo.txt"
+    testfile.write_bytes(content)
+
+    crc, size, data = file_utils._compress_file(str(testfile), zipfile.ZIP_STORED, len(content))
+    assert size == len(content)
+    assert data == content
+    assert crc == zlib.crc32(content)
+
+
+def test_zipbuild_big_file_no_mmap(tmp_path, monkeypatch):
+    """Big files are read in chunks if they can't be mapped to memory."""
+    monkeypatch.setattr("mmap.mmap", mock.Mock(side_effect=OSError("not supported")))
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    content = b"0123456789abcdef" * 200_000
+    (build_dir / "foo.bin").write_bytes(content)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.read("foo.bin") == content
+
+
+def test_zipbuild_big_files_spooled(tmp_path, monkeypatch):
+    """Big files are compressed into temporary files, only the small ones in memory."""
+    monkeypatch.setattr("charmcraft.utils.file._STREAM_FILE_SIZE", 1024 * 1024)
+    monkeypatch.setattr("charmcraft.utils.file._SPOOL_MAX_SIZE", 1024)
+    compress_mock = mock.Mock(wraps=file_utils._compress_file)
+    monkeypatch.setattr("charmcraft.utils.file._compress_file", compress_mock)
+    spooled_mock = mock.Mock(wraps=file_utils._compress_file_spooled)
+    monkeypatch.setattr("charmcraft.utils.file._compress_file_spooled", spooled_mock)
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    contents = {
+        "big.bin": b"0123456789abcdef" * 100_000,
+        "big.whl": b"fedcba9876543210" * 90_000,
+        "small.txt": b"123\x00456" * 1000,
+    }
+    for name, content in contents.items():
+        (build_dir / name).write_bytes(content)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.testzip() is None
+    assert [info.filename for info in zf.infolist()] == ["big.bin", "big.whl", "small.txt"]
+    for name, content in contents.items():
+        assert zf.read(name) == content
+    assert zf.getinfo("big.bin").compress_type == zipfile.ZIP_DEFLATED
+    assert zf.getinfo("big.whl").compress_type == zipfile.ZIP_STORED
+    spooled = [call.args[0] for call in spooled_mock.call_args_list]
+    assert spooled == [str(build_dir / "big.bin"), str(build_dir / "big.whl")]
+    compressed = [call.args[0] for call in compress_mock.call_args_list]
+    assert compressed == [str(build_dir / "small.txt")]
+
+
+def test_zipbuild_big_stored_files_streamed(tmp_path, monkeypatch):
+    """Big files that are just stored are streamed, not read into memory."""
+    compress_mock = mock.Mock(wraps=file_utils._compress_file)
+    monkeypatch.setattr("charmcraft.utils.file._compress_file", compress_mock)
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    stored = b"fedcba9876543210" * 200_000
+    compressed = b"0123456789abcdef" * 200_000
+    (build_dir / "big.whl").write_bytes(stored)
+    (build_dir / "big.bin").write_bytes(compressed)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.testzip() is None
+    assert zf.read("big.whl") == stored
+    assert zf.read("big.bin") == compressed
+    assert [call.args[0] for call in compress_mock.call_args_list] == [str(build_dir / "big.bin")]
+    # the stored file is copied while the other is compressed
+    assert [info.filename for info in zf.infolist()] == ["big.whl", "big.bin"]
+
+
+def test_zipbuild_pending_size_limited(tmp_path, monkeypatch):
+    """The files compressed at once are limited by their total size."""
+    monkeypatch.setattr("charmcraft.utils.file._MAX_PENDING_SIZE", 10_000)
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    for idx in range(20):
+        (build_dir / f"file-{idx:02d}.txt").write_bytes(str(idx).encode() * 3000)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zf = zipfile.ZipFile(zip_filepath)
+    assert zf.testzip() is None
+    for idx in range(20):
+        assert zf.read(f"file-{idx:02d}.txt") == str(idx).encode() * 3000
+
+
+def test_zipbuild_estimate_stored_size(tmp_path):
+    """The size reserved for a zip with stored members covers their headers too."""
+    build_dir = tmp_path / "somedir"
+    (build_dir / "subdir").mkdir(parents=True)
+    for idx in range(50):
+        (build_dir / "subdir" / f"file-ñ-{idx:02d}.whl").write_bytes(b"x" * idx)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    with mock.patch("charmcraft.utils.file._preallocate") as preallocate_mock:
+        build_zip(zip_filepath, build_dir)
+    assert preallocate_mock.call_args.args[1] == zip_filepath.stat().st_size
+
+
+def test_zipbuild_estimate_compressed_size(tmp_path):
+    """The size reserved for a zip with compressed members is not more than it takes."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    for idx in range(10):
+        (build_dir / f"file-{idx:02d}.txt").write_bytes(os.urandom(1000 * idx))
+    (build_dir / "file.whl").write_bytes(b"x" * 5000)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    with mock.patch("charmcraft.utils.file._preallocate") as preallocate_mock:
+        build_zip(zip_filepath, build_dir)
+    reserved = preallocate_mock.call_args.args[1]
+    assert 5000 < reserved <= zip_filepath.stat().st_size
+
+
+def test_zipbuild_no_trailing_space(tmp_path):
+    """The zip ends with its end record, whatever space was reserved for it."""
+    build_dir = tmp_path / "somedir"
+    build_dir.mkdir()
+    (build_dir / "foo.txt").write_bytes(b"a" * 1_000_000)
+
+    zip_filepath = tmp_path / "testresult.zip"
+    build_zip(zip_filepath, build_dir)
+
+    zip_content = zip_filepath.read_bytes()
+    assert len(zip_content) < 10_000
+    assert zip_content[-22:-18] == b"PK\x05\x06"
@@ -32,6 +32,13 @@ def test_load_yaml_success(tmp_path):
     assert content == {"foo": 33}
 
 
+def test_load_yaml_unicode(tmp_path):
+    test_file = tmp_path / "testfile.yaml"
+    test_file.write_bytes("foo: mo\u00f1o\n".encode())
+    content = load_yaml(test_file)
+    assert content == {"foo": "mo\u00f1o"}
+
+
 def test_load_yaml_no_file(tmp_path, emitter):
     test_file = tmp_path / "testfile.yaml"
     content = load_yaml(test_file)